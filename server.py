@@ -1,52 +1,177 @@
 import os
 import json
+import asyncio
+import time
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from uuid import uuid4
+from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import oandapyV20
-from oandapyV20 import API
-from oandapyV20.endpoints import accounts, orders, positions, pricing, instruments
-from oandapyV20.exceptions import V20Error
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
+import httpx
+import redis.asyncio as aioredis
 import uvicorn
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging; per-request log output is a measurable throughput cost,
+# so production keeps only warnings and disables uvicorn's access log.
+ENV = os.getenv("ENV", "prod")
+logging.basicConfig(level=logging.WARNING if ENV == "prod" else logging.INFO)
+if ENV == "prod":
+    # Route records through a queue so handler I/O (stdout writes) happens on
+    # the listener thread instead of blocking the event loop.
+    import queue
+    from logging.handlers import QueueHandler, QueueListener
+    _log_queue = queue.SimpleQueue()
+    _root_logger = logging.getLogger()
+    _log_listener = QueueListener(_log_queue, *_root_logger.handlers, respect_handler_level=True)
+    _root_logger.handlers = [QueueHandler(_log_queue)]
+    _log_listener.start()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(
     title="Oanda MCP Server",
     description="REST API for Oanda trading operations compatible with MCP",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Add CORS middleware; an explicit origin list keeps responses cacheable by
+# browsers/CDNs, with the wildcard kept only as a fallback when unconfigured.
+ALLOWED_ORIGINS = [o for o in os.getenv("ALLOWED_ORIGINS", "").split(",") if o] or ["*"]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
 )
 
-# Initialize Oanda client
+# Compress large responses (mainly /historical candle payloads); small
+# responses stay below the threshold and are sent as-is.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# Oanda configuration
 OANDA_API_KEY = os.getenv("OANDA_API_KEY")
 OANDA_ACCOUNT_ID = os.getenv("OANDA_ACCOUNT_ID")
 OANDA_ENVIRONMENT = os.getenv("OANDA_ENVIRONMENT", "practice")
 
+OANDA_HOST = {
+    "practice": "https://api-fxpractice.oanda.com",
+    "live": "https://api-fxtrade.oanda.com"
+}
+
 if not OANDA_API_KEY or not OANDA_ACCOUNT_ID:
     logger.error("Missing Oanda API credentials")
     raise ValueError("Oanda API credentials not found in environment variables.")
 
-try:
-    oanda_client = API(access_token=OANDA_API_KEY, environment=OANDA_ENVIRONMENT)
-    logger.info(f"Oanda client initialized for {OANDA_ENVIRONMENT} environment")
-except Exception as e:
-    logger.error(f"Failed to initialize Oanda client: {e}")
-    raise
+# Account-scoped API paths are fixed for the life of the process, so build
+# them once instead of formatting the account ID on every request.
+ACCOUNT_URL = f"/v3/accounts/{OANDA_ACCOUNT_ID}"
+POSITIONS_URL = f"{ACCOUNT_URL}/openPositions"
+ORDERS_URL = f"{ACCOUNT_URL}/orders"
+PRICING_URL = f"{ACCOUNT_URL}/pricing"
+
+@lru_cache(maxsize=1)
+def _oanda_cfg() -> Dict[str, Any]:
+    """Environment-specific base URL and common headers, materialized once.
+
+    Central place for live/practice switching; everything that talks to
+    Oanda derives its connection settings from here.
+    """
+    return {
+        "base": OANDA_HOST[OANDA_ENVIRONMENT],
+        "headers": {
+            "Authorization": f"Bearer {OANDA_API_KEY}",
+            "Content-Type": "application/json",
+            "Accept-Datetime-Format": "RFC3339"
+        }
+    }
+
+@app.on_event("startup")
+async def startup():
+    """Create the shared async HTTP client once per worker process.
+
+    The client holds a connection pool that is not fork-safe, so it must be
+    built after uvicorn has spawned the worker rather than at import time.
+    """
+    cfg = _oanda_cfg()
+    app.state.http = httpx.AsyncClient(
+        base_url=cfg["base"],
+        headers=cfg["headers"],
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=httpx.Timeout(10.0)
+    )
+    app.state.redis = aioredis.from_url(
+        os.getenv("REDIS_URL", "redis://localhost"),
+        decode_responses=True
+    )
+    app.state.now_iso = datetime.now().isoformat()
+    app.state.clock_task = asyncio.create_task(_refresh_clock())
+    app.state.ready_lock = asyncio.Lock()
+    app.state.ready_result = None
+    app.state.ready_at = 0.0
+    app.state.inflight = {}
+    logger.info(f"Oanda HTTP client initialized for {OANDA_ENVIRONMENT} environment")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared HTTP client and the Redis connection pool."""
+    app.state.clock_task.cancel()
+    await app.state.http.aclose()
+    await app.state.redis.aclose()
+
+async def _refresh_clock():
+    """Keep a second-granularity timestamp cached for the health endpoints."""
+    while True:
+        app.state.now_iso = datetime.now().isoformat()
+        await asyncio.sleep(1)
+
+async def _oanda(method: str, path: str, **kwargs) -> Dict[str, Any]:
+    """Perform a request against the Oanda v3 REST API and return the JSON body."""
+    response = await app.state.http.request(method, path, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+async def _single_flight(key: str, coro_fn) -> Dict[str, Any]:
+    """Coalesce concurrent identical Oanda reads into one in-flight request.
+
+    If a request for the same key is already running, later callers await
+    its future instead of firing another upstream call.
+    """
+    fut = app.state.inflight.get(key)
+    if fut is not None:
+        return await fut
+    fut = asyncio.ensure_future(coro_fn())
+    app.state.inflight[key] = fut
+    try:
+        return await fut
+    finally:
+        app.state.inflight.pop(key, None)
+
+async def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Fetch a cached JSON value, treating any Redis failure as a miss."""
+    try:
+        cached = await app.state.redis.get(key)
+    except Exception as e:
+        logger.warning(f"Redis get failed for {key}: {e}")
+        return None
+    return json.loads(cached) if cached else None
+
+async def _cache_set(key: str, value: Dict[str, Any], ttl: int):
+    """Store a JSON value with a TTL, ignoring Redis failures."""
+    try:
+        await app.state.redis.set(key, json.dumps(value), ex=ttl)
+    except Exception as e:
+        logger.warning(f"Redis set failed for {key}: {e}")
 
 @app.get("/")
 async def root():
@@ -55,37 +180,65 @@ async def root():
         "message": "Oanda MCP Server is running!",
         "environment": OANDA_ENVIRONMENT,
         "status": "healthy",
-        "timestamp": datetime.now().isoformat()
+        "timestamp": app.state.now_iso
     }
 
+# How long a readiness result stays valid before Oanda is probed again.
+READY_TTL = 10.0
+
+async def _check_oanda() -> Dict[str, Any]:
+    """Memoized Oanda connectivity check shared by /health and /ready.
+
+    Probes arrive every few seconds from the platform, so the real upstream
+    call is made at most once per READY_TTL; concurrent probes coalesce on
+    the lock instead of each firing their own request.
+    """
+    if app.state.ready_result is not None and time.monotonic() - app.state.ready_at < READY_TTL:
+        return app.state.ready_result
+    async with app.state.ready_lock:
+        # Re-check under the lock: another probe may have refreshed it.
+        if app.state.ready_result is not None and time.monotonic() - app.state.ready_at < READY_TTL:
+            return app.state.ready_result
+        try:
+            await _oanda("GET", ACCOUNT_URL)
+            result = {
+                "status": "healthy",
+                "oanda_connection": "ok",
+                "account_id": OANDA_ACCOUNT_ID,
+                "environment": OANDA_ENVIRONMENT
+            }
+        except Exception as e:
+            result = {
+                "status": "unhealthy",
+                "error": str(e),
+                "oanda_connection": "failed"
+            }
+        app.state.ready_result = result
+        app.state.ready_at = time.monotonic()
+        return result
+
+@app.get("/live")
+async def liveness():
+    """Liveness probe: the process is up, no external calls."""
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe backed by the cached Oanda connectivity check."""
+    return await _check_oanda()
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
-    try:
-        # Test Oanda connection
-        r = accounts.AccountDetails(accountID=OANDA_ACCOUNT_ID)
-        oanda_client.request(r)
-        return {
-            "status": "healthy",
-            "oanda_connection": "ok",
-            "account_id": OANDA_ACCOUNT_ID,
-            "environment": OANDA_ENVIRONMENT
-        }
-    except Exception as e:
-        return {
-            "status": "unhealthy",
-            "error": str(e),
-            "oanda_connection": "failed"
-        }
+    return await _check_oanda()
 
 @app.get("/account")
 async def get_account_info():
     """Get account information including balance, equity, and margin details."""
     try:
-        r = accounts.AccountDetails(accountID=OANDA_ACCOUNT_ID)
-        oanda_client.request(r)
-        account_info = r.response['account']
-        
+        response = await _single_flight("account", lambda: _oanda("GET", ACCOUNT_URL))
+        account_info = response['account']
+
         return {
             "success": True,
             "data": {
@@ -102,9 +255,9 @@ async def get_account_info():
                 "pending_order_count": account_info['pendingOrderCount']
             }
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in get_account_info: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in get_account_info: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
@@ -113,18 +266,17 @@ async def get_account_info():
 async def get_positions():
     """Get all current positions."""
     try:
-        r = positions.OpenPositions(accountID=OANDA_ACCOUNT_ID)
-        oanda_client.request(r)
-        positions_data = r.response.get('positions', [])
-        
+        response = await _single_flight("positions", lambda: _oanda("GET", POSITIONS_URL))
+        positions_data = response.get('positions', [])
+
         return {
             "success": True,
             "data": positions_data,
             "count": len(positions_data)
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in get_positions: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in get_positions: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
@@ -133,165 +285,181 @@ async def get_positions():
 async def get_orders():
     """Get all pending orders."""
     try:
-        r = orders.OrderList(accountID=OANDA_ACCOUNT_ID)
-        oanda_client.request(r)
-        orders_data = r.response.get('orders', [])
-        
+        response = await _single_flight("orders", lambda: _oanda("GET", ORDERS_URL))
+        orders_data = response.get('orders', [])
+
         return {
             "success": True,
             "data": orders_data,
             "count": len(orders_data)
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in get_orders: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in get_orders: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
-@app.get("/price/{instrument}")
-async def get_current_price(instrument: str):
-    """Get current bid/ask prices for an instrument."""
+def _price_row(price_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the per-instrument price payload from an Oanda pricing entry."""
+    bids = price_data.get('bids') or [{}]
+    asks = price_data.get('asks') or [{}]
+    bid = bids[0].get('price')
+    ask = asks[0].get('price')
+    return {
+        "instrument": price_data.get('instrument'),
+        "bid": bid if bid is not None else 'N/A',
+        "ask": ask if ask is not None else 'N/A',
+        "spread": float(ask) - float(bid) if bid is not None and ask is not None else None,
+        "time": price_data.get('time')
+    }
+
+@app.get("/prices")
+async def get_prices(instruments: str):
+    """Get current bid/ask prices for a comma-separated list of instruments."""
     try:
-        params = {"instruments": instrument}
-        r = pricing.PricingInfo(accountID=OANDA_ACCOUNT_ID, params=params)
-        oanda_client.request(r)
-        prices = r.response.get('prices', [])
-        
+        response = await _single_flight(
+            f"prices:{instruments}",
+            lambda: _oanda("GET", PRICING_URL, params={"instruments": instruments})
+        )
+        prices = response.get('prices', [])
+
         if not prices:
-            raise HTTPException(status_code=404, detail=f"No price data found for {instrument}")
-        
-        price_data = prices[0]
-        
-        return {
-            "success": True,
-            "data": {
-                "instrument": instrument,
-                "bid": price_data.get('bids', [{}])[0].get('price', 'N/A'),
-                "ask": price_data.get('asks', [{}])[0].get('price', 'N/A'),
-                "spread": float(price_data.get('asks', [{}])[0].get('price', 0)) - float(price_data.get('bids', [{}])[0].get('price', 0)),
-                "time": price_data.get('time')
-            }
-        }
-    except V20Error as e:
-        logger.error(f"Oanda API error in get_current_price: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+            raise HTTPException(status_code=404, detail=f"No price data found for {instruments}")
+
+        data = [_price_row(p) for p in prices]
+
+        return {"success": True, "data": data, "count": len(data)}
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Oanda API error in get_prices: {e}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
-        logger.error(f"Unexpected error in get_current_price: {e}")
+        logger.error(f"Unexpected error in get_prices: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+@app.get("/price/{instrument}")
+async def get_current_price(instrument: str):
+    """Get current bid/ask prices for an instrument."""
+    cache_key = f"px:{instrument}"
+    cached = await _cache_get(cache_key)
+    if cached:
+        return {"success": True, "data": cached}
+
+    result = await get_prices(instruments=instrument)
+    data = result["data"][0]
+    await _cache_set(cache_key, data, ttl=2)
+
+    return {"success": True, "data": data}
+
+def _candle_stream(instrument: str, granularity: str, candles: List[Dict[str, Any]]):
+    """Incrementally encode the /historical payload, one candle per chunk.
+
+    Keeps the response body from being materialized as a single large
+    bytestring and gets the first bytes onto the wire immediately.
+    """
+    meta = orjson.dumps({"instrument": instrument, "granularity": granularity})
+    yield b'{"success":true,"data":' + meta[:-1] + b',"candles":['
+    for i, candle in enumerate(candles):
+        if i:
+            yield b','
+        yield orjson.dumps(candle)
+    yield b'],"count":%d}}' % len(candles)
+
 @app.get("/historical/{instrument}")
 async def get_historical_data(instrument: str, granularity: str = "D", count: int = 100):
     """Get historical candle data for an instrument."""
     try:
-        params = {
-            "granularity": granularity,
-            "count": min(count, 5000)
-        }
-        
-        r = instruments.InstrumentsCandles(instrument=instrument, params=params)
-        oanda_client.request(r)
-        candles = r.response.get('candles', [])
-        
-        return {
-            "success": True,
-            "data": {
-                "instrument": instrument,
+        cache_key = f"candles:{instrument}:{granularity}:{min(count, 5000)}"
+        cached = await _cache_get(cache_key)
+        if cached:
+            candles = cached['candles']
+        else:
+            params = {
                 "granularity": granularity,
-                "candles": candles,
-                "count": len(candles)
+                "count": min(count, 5000)
             }
-        }
-    except V20Error as e:
+
+            response = await _oanda("GET", f"/v3/instruments/{instrument}/candles", params=params)
+            candles = response.get('candles', [])
+
+            # Completed daily/weekly/monthly history is static for hours;
+            # anything with a still-forming candle only stays cached a minute.
+            # Exact match: minute granularities (M1..M30) also start with M.
+            if granularity in ("D", "W", "M") and candles and candles[-1].get('complete'):
+                ttl = 3600
+            else:
+                ttl = 60
+            await _cache_set(cache_key, {"candles": candles}, ttl=ttl)
+
+        return StreamingResponse(
+            _candle_stream(instrument, granularity, candles),
+            media_type="application/json"
+        )
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in get_historical_data: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in get_historical_data: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+class MarketOrderIn(BaseModel):
+    """Request body for a market order."""
+    instrument: str
+    units: int
+    stop_loss: Optional[Decimal] = None
+    take_profit: Optional[Decimal] = None
+
+class LimitOrderIn(MarketOrderIn):
+    """Request body for a limit order."""
+    price: Decimal
+
+def _order_payload(order: MarketOrderIn, order_type: str) -> Dict[str, Any]:
+    """Build the Oanda order creation payload from a validated request body."""
+    payload = {
+        "type": order_type,
+        "instrument": order.instrument,
+        "units": str(order.units)
+    }
+    if isinstance(order, LimitOrderIn):
+        payload["price"] = str(order.price)
+    if order.stop_loss is not None:
+        payload["stopLossOnFill"] = {"price": str(order.stop_loss)}
+    if order.take_profit is not None:
+        payload["takeProfitOnFill"] = {"price": str(order.take_profit)}
+    return {"order": payload}
+
 @app.post("/order/market")
-async def place_market_order(order_request: Dict[str, Any]):
+async def place_market_order(order_request: MarketOrderIn):
     """Place a market order."""
     try:
-        required_fields = ["instrument", "units"]
-        for field in required_fields:
-            if field not in order_request:
-                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
-        
-        order_data = {
-            "order": {
-                "type": "MARKET",
-                "instrument": order_request["instrument"],
-                "units": str(order_request["units"])
-            }
-        }
-        
-        # Add optional stop loss
-        if order_request.get("stop_loss"):
-            order_data["order"]["stopLossOnFill"] = {
-                "price": str(order_request["stop_loss"])
-            }
-        
-        # Add optional take profit
-        if order_request.get("take_profit"):
-            order_data["order"]["takeProfitOnFill"] = {
-                "price": str(order_request["take_profit"])
-            }
-        
-        r = orders.OrderCreate(accountID=OANDA_ACCOUNT_ID, data=order_data)
-        oanda_client.request(r)
-        
+        response = await _oanda("POST", ORDERS_URL, json=_order_payload(order_request, "MARKET"))
+
         return {
             "success": True,
-            "data": r.response
+            "data": response
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in place_market_order: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in place_market_order: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 @app.post("/order/limit")
-async def place_limit_order(order_request: Dict[str, Any]):
+async def place_limit_order(order_request: LimitOrderIn):
     """Place a limit order."""
     try:
-        required_fields = ["instrument", "units", "price"]
-        for field in required_fields:
-            if field not in order_request:
-                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
-        
-        order_data = {
-            "order": {
-                "type": "LIMIT",
-                "instrument": order_request["instrument"],
-                "units": str(order_request["units"]),
-                "price": str(order_request["price"])
-            }
-        }
-        
-        # Add optional stop loss
-        if order_request.get("stop_loss"):
-            order_data["order"]["stopLossOnFill"] = {
-                "price": str(order_request["stop_loss"])
-            }
-        
-        # Add optional take profit
-        if order_request.get("take_profit"):
-            order_data["order"]["takeProfitOnFill"] = {
-                "price": str(order_request["take_profit"])
-            }
-        
-        r = orders.OrderCreate(accountID=OANDA_ACCOUNT_ID, data=order_data)
-        oanda_client.request(r)
-        
+        response = await _oanda("POST", ORDERS_URL, json=_order_payload(order_request, "LIMIT"))
+
         return {
             "success": True,
-            "data": r.response
+            "data": response
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in place_limit_order: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in place_limit_order: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
@@ -300,59 +468,75 @@ async def place_limit_order(order_request: Dict[str, Any]):
 async def cancel_order(order_id: str):
     """Cancel a pending order."""
     try:
-        r = orders.OrderCancel(accountID=OANDA_ACCOUNT_ID, orderID=order_id)
-        oanda_client.request(r)
-        
+        response = await _oanda("PUT", f"{ORDERS_URL}/{order_id}/cancel")
+
         return {
             "success": True,
-            "data": r.response
+            "data": response
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in cancel_order: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in cancel_order: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
+# Oanda treats the payload as read-only, so the full-close shape can be shared.
+_CLOSE_ALL = {"longUnits": "ALL", "shortUnits": "ALL"}
+
 @app.post("/position/close/{instrument}")
 async def close_position(instrument: str, units: str = "ALL"):
     """Close a position for an instrument."""
+    if units == "ALL":
+        close_data = _CLOSE_ALL
+    else:
+        try:
+            n = int(units)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid units value: {units}")
+        close_data = {"longUnits": str(n)} if n > 0 else {"shortUnits": str(-n)}
+
     try:
-        if units == "ALL":
-            close_data = {
-                "longUnits": "ALL",
-                "shortUnits": "ALL"
-            }
-        else:
-            if int(units) > 0:
-                close_data = {"longUnits": units}
-            else:
-                close_data = {"shortUnits": str(abs(int(units)))}
-        
-        r = positions.PositionClose(accountID=OANDA_ACCOUNT_ID, instrument=instrument, data=close_data)
-        oanda_client.request(r)
-        
+        response = await _oanda(
+            "PUT",
+            f"{ACCOUNT_URL}/positions/{instrument}/close",
+            json=close_data
+        )
+
         return {
             "success": True,
-            "data": r.response
+            "data": response
         }
-    except V20Error as e:
+    except httpx.HTTPStatusError as e:
         logger.error(f"Oanda API error in close_position: {e}")
-        raise HTTPException(status_code=400, detail=f"Oanda API error: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Oanda API error: {e.response.text}")
     except Exception as e:
         logger.error(f"Unexpected error in close_position: {e}")
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    """Global exception handler"""
-    logger.error(f"Global exception: {exc}")
-    return JSONResponse(
+    """Log unhandled exceptions once and return a constant-size response.
+
+    The exception detail stays in the logs, keyed by a request id the
+    client can quote, rather than being echoed back in the response body.
+    """
+    rid = uuid4().hex
+    logger.error(f"Unhandled exception rid={rid}", exc_info=exc)
+    return ORJSONResponse(
         status_code=500,
-        content={"success": False, "error": "Internal server error", "detail": str(exc)}
+        content={"success": False, "error": "Internal server error", "rid": rid}
     )
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     logger.info(f"Starting server on port {port}")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1)),
+        access_log=(ENV != "prod")
+    )